@@ -7,12 +7,18 @@ book collection.
 
 from datetime import date
 import json
+import logging
 import os
+import threading
 
 import streamlit as st
-import numpy as np
+import orjson
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2 import extensions, pool
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
 
 # --- Load Environment Variables & Setup Database Connection ---
 load_dotenv()
@@ -21,30 +27,271 @@ if not DB_URL:
     st.error("DATABASE_URL is not set in the .env file")
     st.stop()
 
+
+# Statements prepared once per physical connection to skip parse/plan costs.
+PREPARED_STATEMENTS = (
+    "PREPARE ins_book(text, text, int, text, text) AS "
+    "INSERT INTO books (title, author, year, genre, status) "
+    "VALUES ($1, $2, $3, $4, $5)",
+    "PREPARE search_books(text) AS "
+    "SELECT title, author, year, genre, status FROM books "
+    "WHERE title ILIKE $1 OR author ILIKE $1",
+    "PREPARE del_book(int) AS DELETE FROM books WHERE id = $1 RETURNING id",
+)
+
+
+class LibraryConnection(extensions.connection):
+    """Connection that remembers whether its statements are prepared."""
+
+    prepared = False
+
+
+@st.cache_resource
+def get_pool():
+    """Create the database connection pool once and share it across reruns."""
+    return pool.ThreadedConnectionPool(
+        1, 10, DB_URL, connection_factory=LibraryConnection)
+
+
+# --- Create Books Table and Indexes if They Don't Exist ---
+@st.cache_resource
+def init_schema():
+    """Run the one-time DDL once per server process instead of every rerun."""
+    conn = get_pool().getconn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS books (
+                id SERIAL PRIMARY KEY,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                genre TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+        """)
+        # Lets the Stats tab's counts read this narrow index instead of the
+        # table. It is still a pass over every row, so the cost stays O(N).
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS books_status_idx ON books (status);"
+        )
+        conn.commit()
+        # Trigram indexes let the ILIKE '%...%' search use an index scan.
+        # They are optional, so a role that cannot create extensions only
+        # loses the speed-up.
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS books_title_trgm "
+                "ON books USING gin (title gin_trgm_ops);"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS books_author_trgm "
+                "ON books USING gin (author gin_trgm_ops);"
+            )
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            logger.warning("Skipping trigram search indexes: %s", e)
+    finally:
+        get_pool().putconn(conn)
+
+
 try:
-    conn = psycopg2.connect(DB_URL)
-    cursor = conn.cursor()
+    get_pool()
+    init_schema()
 except psycopg2.Error as e:
-    st.error(f"Error connecting to the database: {e}")
+    st.error(f"Error setting up the database: {e}")
     st.stop()
 
-# --- Create Books Table if It Doesn't Exist ---
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS books (
-        id SERIAL PRIMARY KEY,
-        title TEXT NOT NULL,
-        author TEXT NOT NULL,
-        year INTEGER NOT NULL,
-        genre TEXT NOT NULL,
-        status TEXT NOT NULL
-    );
-""")
-conn.commit()
+
+def get_connection(readonly=False):
+    """Check a connection out of the pool, preparing statements on first use.
+
+    ``readonly`` connections run in autocommit mode so plain SELECTs skip the
+    implicit BEGIN/ROLLBACK. Return it with ``get_pool().putconn(conn)``.
+    """
+    conn = get_pool().getconn()
+    try:
+        if not conn.prepared:
+            cursor = conn.cursor()
+            for statement in PREPARED_STATEMENTS:
+                cursor.execute(statement)
+            conn.commit()
+            conn.prepared = True
+        conn.autocommit = readonly
+    except psycopg2.Error:
+        get_pool().putconn(conn)
+        raise
+    return conn
+
+
+# --- Cached Read Queries ---
+BOOKS_PER_PAGE = 20
+EXPORT_COLUMNS = ("title", "author", "year", "genre", "status")
+
+
+@st.cache_data(show_spinner=False)
+def fetch_books_page(version: int, page: int):
+    """Return one page of books; ``version`` changes on every table write."""
+    conn = get_connection(readonly=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, title, author, year, genre, status FROM books "
+            "ORDER BY id LIMIT %s OFFSET %s",
+            (BOOKS_PER_PAGE, page * BOOKS_PER_PAGE)
+        )
+        return cursor.fetchall()
+    finally:
+        get_pool().putconn(conn)
+
+
+@st.cache_data(show_spinner=False)
+def fetch_stats(version: int):
+    """Return ``(total, read)`` book counts for the given data version."""
+    conn = get_connection(readonly=True)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*), COUNT(*) FILTER (WHERE status = 'Finished') "
+            "FROM books"
+        )
+        total_books, read_books = cursor.fetchone()
+        return total_books, read_books
+    finally:
+        get_pool().putconn(conn)
+
+
+# Only the current version's export can ever be served, so keep just one.
+@st.cache_data(show_spinner=False, max_entries=1)
+def fetch_library_json(version: int):
+    """Stream the library through a server-side cursor into a JSON array."""
+    conn = get_connection()
+    try:
+        buf = bytearray(b"[\n")
+        with conn.cursor(name="export_cur") as cursor:
+            cursor.itersize = 10_000
+            cursor.execute(
+                "SELECT title, author, year, genre, status "
+                "FROM books ORDER BY id"
+            )
+            for i, row in enumerate(cursor):
+                if i:
+                    buf += b",\n"
+                buf += orjson.dumps(dict(zip(EXPORT_COLUMNS, row)),
+                                    option=orjson.OPT_INDENT_2)
+        conn.commit()
+        return bytes(buf + b"\n]")
+    finally:
+        get_pool().putconn(conn)
+
+
+# --- Write Helpers ---
+# Values accepted by the Add Book form; imports are held to the same rules.
+MIN_YEAR = 1000
+MAX_YEAR = 2100
+GENRES = (
+    "Fiction",
+    "Non-fiction",
+    "Mystery",
+    "Romance",
+    "Fantasy",
+    "Science Fiction",
+    "Horror",
+    "History",
+    "Other",
+)
+READING_STATUSES = ("Not Read", "Currently Reading", "Finished")
+
+
+def parse_library_rows(books):
+    """Validate exported books and return rows for ``bulk_add_books``.
+
+    Raises ``ValueError`` naming the first entry the Add Book form would
+    have rejected.
+    """
+    if not isinstance(books, list):
+        raise ValueError("expected a JSON array of books")
+    rows = []
+    for number, book in enumerate(books, start=1):
+        try:
+            title, author = book["title"], book["author"]
+            genre, status = book["genre"], book["status"]
+            year = int(book["year"])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise ValueError(
+                f"book {number} is missing a field or has an invalid year"
+            ) from None
+        if not (isinstance(title, str) and title
+                and isinstance(author, str) and author):
+            raise ValueError(f"book {number} needs a title and an author")
+        if not MIN_YEAR <= year <= MAX_YEAR:
+            raise ValueError(
+                f"book {number} has a year outside {MIN_YEAR}-{MAX_YEAR}")
+        if genre not in GENRES:
+            raise ValueError(f"book {number} has an unknown genre {genre!r}")
+        if status not in READING_STATUSES:
+            raise ValueError(
+                f"book {number} has an unknown status {status!r}")
+        rows.append((title, author, year, genre, status))
+    return rows
+
+
+def bulk_add_books(rows):
+    """Insert many ``(title, author, year, genre, status)`` rows at once.
+
+    Rows sharing a title, author and year collapse to one, and books already
+    in the library with that title, author and year are skipped. Returns the
+    number of books inserted.
+    """
+    unique_rows = list({row[:3]: row for row in rows}.values())
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        inserted = execute_values(
+            cursor,
+            "INSERT INTO books (title, author, year, genre, status) "
+            "SELECT v.title, v.author, v.year, v.genre, v.status "
+            "FROM (VALUES %s) AS v (title, author, year, genre, status) "
+            "WHERE NOT EXISTS (SELECT 1 FROM books AS b "
+            "WHERE b.title = v.title AND b.author = v.author "
+            "AND b.year = v.year) "
+            "RETURNING id",
+            unique_rows,
+            page_size=1000,
+            fetch=True,
+        )
+        conn.commit()
+        return len(inserted)
+    finally:
+        get_pool().putconn(conn)
+
+
+# --- Data Version Shared by All Sessions ---
+class BooksVersion:
+    """Counter bumped after every committed write; keys the read caches."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Advance the version and drop entries no session can hit again."""
+        with self._lock:
+            self.value += 1
+        fetch_books_page.clear()
+        fetch_stats.clear()
+
+
+@st.cache_resource
+def get_books_version():
+    """Return the process-wide version so every session sees fresh data."""
+    return BooksVersion()
+
 
 # --- Streamlit UI Configuration & Custom Styling ---
-st.set_page_config(page_title="Personal Library Manager",
-                   page_icon="📚", layout="wide")
-st.markdown("""
+PAGE_HEADER_HTML = """
     <style>
         #MainMenu, footer {visibility: hidden;}
         .main-title {
@@ -60,11 +307,17 @@ st.markdown("""
         }
         .stButton>button { width: 100%; }
     </style>
-    """, unsafe_allow_html=True)
-st.markdown("""
     <h1 class="main-title">📚 Personal Library Manager</h1>
     <p class="subtitle">By Hamza Sheikh</p>
-    """, unsafe_allow_html=True)
+    """
+
+st.set_page_config(page_title="Personal Library Manager",
+                   page_icon="📚", layout="wide")
+# Style and header go out as one element. They cannot be skipped on later
+# reruns: Streamlit drops any element a rerun does not emit again. st.html
+# skips the markdown pipeline and, unlike components.html, is not iframed,
+# so the CSS still reaches the page.
+st.html(PAGE_HEADER_HTML)
 
 # --- Navigation Tabs Setup ---
 tab1, tab2, tab3, tab4 = st.tabs(
@@ -80,68 +333,143 @@ with tab1:
     with col2:
         publication_year = st.number_input(
             "Publication Year",
-            min_value=1000,
-            max_value=2100,
+            min_value=MIN_YEAR,
+            max_value=MAX_YEAR,
             step=1,
             value=date.today().year
         )
-        genre = st.selectbox(
-            "Genre",
-            [
-                "Fiction",
-                "Non-fiction",
-                "Mystery",
-                "Romance",
-                "Fantasy",
-                "Science Fiction",
-                "Horror",
-                "History",
-                "Other",
-            ],
-        )
+        genre = st.selectbox("Genre", GENRES)
     read_status = st.radio(
         "Reading Status",
-        ["Not Read", "Currently Reading", "Finished"],
+        READING_STATUSES,
         horizontal=True,
     )
 
     if st.button("📥 Add Book"):
         if title and author:
+            conn = None
             try:
+                conn = get_connection()
+                cursor = conn.cursor()
                 cursor.execute(
-                    "INSERT INTO books (title, author, year, genre, status) "
-                    "VALUES (%s, %s, %s, %s, %s)",
+                    "EXECUTE ins_book(%s, %s, %s, %s, %s)",
                     (title, author, publication_year, genre, read_status)
                 )
                 conn.commit()
+                get_books_version().bump()
                 st.success(f"✅ '{title}' by {author} added successfully!")
             except psycopg2.Error as e:
                 st.error(f"❌ Error adding book: {e}")
+            finally:
+                if conn is not None:
+                    get_pool().putconn(conn)
         else:
             st.error("❌ Please enter both the title and the author's name.")
 
+    st.markdown(
+        "<h4 style='margin-top: 30px;'>📥 Import Library</h4>",
+        unsafe_allow_html=True
+    )
+    uploaded_file = st.file_uploader(
+        "Upload a library JSON export", type="json")
+    if uploaded_file is not None and st.button("📥 Import Books"):
+        try:
+            rows = parse_library_rows(json.load(uploaded_file))
+        except ValueError as e:
+            st.error(f"❌ Invalid library file: {e}")
+        else:
+            if rows:
+                try:
+                    inserted = bulk_add_books(rows)
+                    if inserted:
+                        get_books_version().bump()
+                    skipped = len(rows) - inserted
+                    st.success(
+                        f"✅ {inserted} books imported successfully!"
+                        + (f" {skipped} duplicates were skipped."
+                           if skipped else "")
+                    )
+                except psycopg2.Error as e:
+                    st.error(f"❌ Error importing books: {e}")
+            else:
+                st.info("📌 The file contains no books.")
+
+
 # --- Tab 2: View Library Section ---
+def format_book(title, author, year, genre, status):
+    """Return the one-line markdown summary used for book listings."""
+    return f"📖 **{title}** by {author} ({year}) - {genre} | *{status}*"
+
+
+def remove_book(book_id, title):
+    """Delete a book from the Remove button's callback.
+
+    Callbacks run before the rerun that follows the click, so that single
+    rerun already shows the updated list, page count and stats.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("EXECUTE del_book(%s)", (book_id,))
+        deleted = cursor.fetchone()
+        conn.commit()
+        if deleted:
+            get_books_version().bump()
+            result = ("success", f"✅ '{title}' removed successfully!")
+        else:
+            result = ("warning", f"'{title}' was already removed.")
+    except psycopg2.Error as e:
+        result = ("error", f"❌ Error removing book: {e}")
+    finally:
+        if conn is not None:
+            get_pool().putconn(conn)
+    st.session_state["remove_result"] = result
+
+
+def render_book(book):
+    """Render the managed book with its Remove button."""
+    book_id, title, author, year, genre, status = book
+    with st.expander(f"📖 {title} by {author} ({year})", expanded=True):
+        st.write(f"**Genre:** {genre}")
+        st.write(f"**Reading Status:** {status}")
+        st.button(f"Remove {title}", key=f"remove_{book_id}",
+                  on_click=remove_book, args=(book_id, title))
+
+
 with tab2:
     st.subheader("📚 Your Book Collection")
+    if "remove_result" in st.session_state:
+        kind, message = st.session_state.pop("remove_result")
+        getattr(st, kind)(message)
     try:
-        cursor.execute("SELECT * FROM books")
-        books = cursor.fetchall()
-        if not books:
+        version = get_books_version().value
+        total_books, _ = fetch_stats(version)
+        if not total_books:
             st.info("No books added yet. Start adding some!")
         else:
+            total_pages = -(-total_books // BOOKS_PER_PAGE)
+            page = st.number_input(
+                "Page", min_value=1, max_value=total_pages, step=1) - 1
+            st.caption(f"Page {page + 1} of {total_pages} "
+                       f"({total_books} books)")
+            books = fetch_books_page(version, page)
+            # Plain markdown rows; only the selected book gets widgets.
             for book in books:
-                book_id, title, author, year, genre, status = book
-                with st.expander(f"📖 {title} by {author} ({year})"):
-                    st.write(f"**Genre:** {genre}")
-                    st.write(f"**Reading Status:** {status}")
-                    if st.button(f"Remove {title}", key=f"remove_{book_id}"):
-                        try:
-                            cursor.execute(
-                                "DELETE FROM books WHERE id = %s", (book_id,))
-                            conn.commit()
-                            st.success(f"✅ '{title}' removed successfully!")
-                        except psycopg2.Error as e:
-                            st.error(f"❌ Error removing book: {e}")
+                st.markdown(format_book(*book[1:]))
+            books_by_id = {book[0]: book for book in books}
+            expanded_id = st.selectbox(
+                "Manage a book",
+                list(books_by_id),
+                index=None,
+                format_func=lambda book_id: (
+                    f"{books_by_id[book_id][1]} "
+                    f"by {books_by_id[book_id][2]}"
+                ),
+                placeholder="Select a book to view or remove",
+            )
+            if expanded_id is not None:
+                render_book(books_by_id[expanded_id])
     except psycopg2.Error as e:
         st.error(f"❌ Error fetching books: {e}")
 
@@ -151,26 +479,23 @@ with tab3:
     search_query = st.text_input("Enter a book title or author name")
     if st.button("Search"):
         if search_query:
+            conn = None
             try:
-                query = (
-                    "SELECT * FROM books "
-                    "WHERE title ILIKE %s OR author ILIKE %s"
-                )
+                conn = get_connection(readonly=True)
+                cursor = conn.cursor()
                 cursor.execute(
-                    query, (f"%{search_query}%", f"%{search_query}%"))
+                    "EXECUTE search_books(%s)", (f"%{search_query}%",))
                 results = cursor.fetchall()
                 if results:
                     for book in results:
-                        book_id, title, author, year, genre, status = book
-                        book_info = (
-                            f"📖 **{title}** by {author} "
-                            f"({year}) - {genre} | *{status}*"
-                        )
-                        st.write(book_info)
+                        st.write(format_book(*book))
                 else:
                     st.warning("No matching books found.")
             except psycopg2.Error as e:
                 st.error(f"❌ Error searching for books: {e}")
+            finally:
+                if conn is not None:
+                    get_pool().putconn(conn)
         else:
             st.error("Please enter a search query.")
 
@@ -178,13 +503,9 @@ with tab3:
 with tab4:
     st.subheader("📊 Library Statistics")
     try:
-        cursor.execute("SELECT COUNT(*) FROM books")
-        total_books_result = cursor.fetchone()
-        total_books = total_books_result[0] if total_books_result else 0
-        cursor.execute("SELECT COUNT(*) FROM books WHERE status = 'Finished'")
-        read_books_result = cursor.fetchone()
-        read_books = read_books_result[0] if read_books_result else 0
-        read_percentage = np.round(
+        version = get_books_version().value
+        total_books, read_books = fetch_stats(version)
+        read_percentage = round(
             (read_books / total_books) * 100, 2) if total_books > 0 else 0
 
         col1, col2, col3 = st.columns(3)
@@ -216,13 +537,15 @@ with tab4:
             unsafe_allow_html=True
         )
         if total_books > 0:
-            cursor.execute("SELECT * FROM books")
-            books = cursor.fetchall()
-            library_json = json.dumps(books, indent=4)
-            st.download_button(label="📂 Download Library as JSON",
-                               data=library_json,
-                               file_name="books.json",
-                               mime="application/json")
+            # Only build the export once asked, and again after any change.
+            if st.button("🔧 Prepare Export"):
+                st.session_state["export_version"] = version
+            if st.session_state.get("export_version") == version:
+                library_json = fetch_library_json(version)
+                st.download_button(label="📂 Download Library as JSON",
+                                   data=library_json,
+                                   file_name="books.json",
+                                   mime="application/json")
         else:
             st.info("📌 No books to export yet.")
     except psycopg2.Error as e: